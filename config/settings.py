@@ -1,17 +1,27 @@
+import functools
 import os
+from typing import Optional
 
 # The .env file is loaded by main.py using load_dotenv()
-# So os.getenv will work here.
+# Keys are read lazily, so that only has to happen before the first lookup.
 
 # --- API Key Mappings ---
-API_KEYS = {
-    "openai": os.getenv('OPENAI_API_KEY'),
-    "groq": os.getenv('GROQ_API_KEY'),
-    "google": os.getenv('GOOGLE_API_KEY'),
-    "anthropic": os.getenv('ANTHROPIC_API_KEY'),
-    "xai": os.getenv('XAI_API_KEY'),
+PROVIDER_ENV_VARS = {
+    "openai": "OPENAI_API_KEY",
+    "groq": "GROQ_API_KEY",
+    "google": "GOOGLE_API_KEY",
+    "anthropic": "ANTHROPIC_API_KEY",
+    "xai": "XAI_API_KEY",
 }
 
+
+@functools.lru_cache(maxsize=None)
+def get_api_key(provider: str) -> Optional[str]:
+    """Returns the API key for a provider, reading the environment only on first use."""
+    env_var = PROVIDER_ENV_VARS.get(provider)
+    return os.environ.get(env_var) if env_var else None
+
+
 API_KEY_ARG_NAMES = {
     "openai": "openai_api_key",
     "groq": "groq_api_key",
@@ -20,6 +30,17 @@ API_KEY_ARG_NAMES = {
     "xai": "api_key",
 }
 
+# --- Conversation Settings ---
+# Number of question/answer pairs kept as context for follow-up questions.
+# Older turns are dropped so prompt size (and LLM latency/cost) stays bounded.
+MAX_HISTORY_TURNS = 10
+
+# --- LLM Response Cache ---
+# Opt-in SQLite file for LangChain's exact-match response cache (e.g. ".langchain.db").
+# Setting it makes the research agent call its model through invoke instead of
+# .stream() (streamed calls bypass the cache), so answers print whole, not token by token.
+LLM_CACHE_DATABASE_PATH = None
+
 # --- Define Available Tasks ---
 TASKS = {
     "1": {"name": "Refine Text (Email, Article, etc.)", "id": "refine"},
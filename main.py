@@ -1,5 +1,10 @@
+import atexit
+import functools
 import sys
 import traceback
+from collections import deque
+from itertools import groupby
+from typing import Any, NoReturn, Optional
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -18,16 +23,34 @@ except Exception as e:
     sys.exit(1)
 
 # --- Import LangChain Components ---
+# The agent and prompt modules are imported lazily in run_research_qa_loop,
+# so callers that only need model initialization skip their import cost.
 try:
-    from langchain.agents import AgentExecutor, create_tool_calling_agent
-    from langchain_core.prompts import ChatPromptTemplate
-    from langchain_core.messages import BaseMessage, HumanMessage
+    from langchain_core.callbacks import BaseCallbackHandler
+    from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
     from langchain_core.tools import BaseTool
 except ImportError as e:
     print(f"FATAL ERROR: Could not import LangChain components: {e}")
     print("Please ensure LangChain is installed correctly (e.g., pip install langchain-core langchain-community langchain).")
     sys.exit(1)
 
+# --- Import Search Backend ---
+# A missing search package only breaks searches (reported by the tool's result),
+# not startup or callers that just use initialize_all_ai_models.
+try:
+    from ddgs import DDGS
+    _SEARCH_IMPORT_ERROR = None
+except ImportError as e:
+    DDGS = None
+    _SEARCH_IMPORT_ERROR = f"Could not import the DuckDuckGo search client (pip install ddgs): {e}"
+
+try:
+    import orjson  # Faster JSON encoding for search results passed back to the agent
+except ImportError as e:
+    print(f"FATAL ERROR: Could not import orjson: {e}")
+    print("Please ensure orjson is installed correctly (e.g., pip install orjson).")
+    sys.exit(1)
+
 # --- Import Configurations and Utilities ---
 try:
     from config import settings  # For API key loading logic
@@ -40,17 +63,96 @@ except ImportError as e:
 
 
 # --- Helper Functions ---
-def _display_model_menu(model_keys: list):
-    """Prints a formatted menu of available models, grouped by provider."""
-    current_provider_group = None
-    for i, key in enumerate(model_keys):
-        provider_name = key.split('/')[0]
-        if provider_name != current_provider_group:
-            if current_provider_group is not None:
-                print("---")
-            current_provider_group = provider_name
-            print(f"--- {provider_name.upper()} ---")
-        print(f"{i + 1}. {key}")
+def _group_models_by_provider(model_keys: list[str]) -> list[tuple[str, list[tuple[int, str]]]]:
+    """
+    Groups sorted model keys by provider, keeping their 1-based menu numbers.
+    Computed once per session so menu redraws don't re-split every key.
+    """
+    numbered_keys = enumerate(model_keys, start=1)
+    return [
+        (provider_name, list(entries))
+        for provider_name, entries in groupby(numbered_keys, key=lambda entry: entry[1].partition('/')[0])
+    ]
+
+
+def _render_model_menu(model_groups: list[tuple[str, list[tuple[int, str]]]]) -> str:
+    """
+    Renders the menu of available models, grouped by provider.
+    The model set is fixed for the session, so this is done once and reused.
+    """
+    lines = []
+    for group_index, (provider_name, entries) in enumerate(model_groups):
+        if group_index:
+            lines.append("---")
+        lines.append(f"--- {provider_name.upper()} ---")
+        lines.extend(f"{number}. {key}" for number, key in entries)
+    return "\n".join(lines) + "\n"
+
+
+# --- Post-Answer Menu ---
+_ACTION_PROMPT = (
+    "Options:\n"
+    "1. Ask a follow-up (continue this conversation)\n"
+    "2. Start a new topic (clears conversation history)\n"
+    "3. Change model\n"
+    "4. Exit program\n"
+    "Enter choice (1/2/3/4): "
+)
+
+
+def _ask_follow_up(selected_key: str, chat_history: deque) -> bool:
+    """Keeps the current session and its history."""
+    return True
+
+
+def _start_new_topic(selected_key: str, chat_history: deque) -> bool:
+    """Keeps the current session but clears its history."""
+    print("\nClearing conversation history for a new topic.")
+    chat_history.clear()
+    return True
+
+
+def _change_model(selected_key: str, chat_history: deque) -> bool:
+    """Ends the session so the model selection loop restarts."""
+    print(f"Ending session with {selected_key}.")
+    return False
+
+
+def _exit_program(selected_key: str, chat_history: deque) -> NoReturn:
+    """Exits the program."""
+    print("Exiting program.")
+    sys.exit(0)
+
+
+# Maps each menu choice to a handler returning whether the Q&A session continues.
+_POST_ANSWER_ACTIONS = {
+    '1': _ask_follow_up,
+    '2': _start_new_topic,
+    '3': _change_model,
+    '4': _exit_program,
+}
+
+
+# --- Answer Streaming ---
+class _AnswerStreamPrinter(BaseCallbackHandler):
+    """
+    Writes LLM tokens to stdout as the agent's model streams them, printing the
+    answer header before the first token. Records whether anything was streamed
+    so the caller can fall back to printing the whole answer.
+    """
+
+    def __init__(self, header: str) -> None:
+        self.header = header
+        self.started = False
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if not token:
+            return
+        if not self.started:
+            print(self.header)
+            self.started = True
+        sys.stdout.write(token)
+        sys.stdout.flush()
 
 
 # --- Custom DuckDuckGo Search Tool ---
@@ -59,62 +161,81 @@ class DuckDuckGoSearchResults(BaseTool):
     
     name: str = "duckduckgo_results_json"
     description: str = "A tool that searches DuckDuckGo for results and returns them as a JSON array."
-    
+
+    # Shared across searches so the HTTP connection pool is reused between queries.
+    _ddgs_client: Optional[DDGS] = None
+
+    def _get_client(self) -> DDGS:
+        """Returns the search client, opening it on first use and closing it at exit."""
+        if self._ddgs_client is None:
+            if DDGS is None:
+                raise ImportError(_SEARCH_IMPORT_ERROR)
+            client = DDGS().__enter__()
+            atexit.register(client.__exit__, None, None, None)
+            self._ddgs_client = client
+        return self._ddgs_client
+
     def _run(self, query: str) -> str:
         """Execute the search and return results."""
         try:
-            # The `ddg` function from older versions of `duckduckgo-search` is deprecated.
-            # We now use the synchronous `DDGS` class.
-            from ddgs.ddgs_sync import DDGS
-
-            with DDGS() as ddgs:
-                results = ddgs.text(query, max_results=10)
+            results = self._get_client().text(query, max_results=10)
 
             # Format results as JSON string
-            import json
-            return json.dumps(results) if results else "[]"
+            return orjson.dumps(results).decode("utf-8") if results else "[]"
         except Exception as e:
             return f"Error performing search: {str(e)}"
 
 
 # --- Model Initialization Wrapper ---
-def initialize_all_ai_models():
+def initialize_all_ai_models() -> tuple[model_loader.ModelRegistry, dict[str, str]]:
     """
     Initializes AI models by calling the main initializer function from model_loader.py.
     This function now passes configuration directly, decoupling the loader.
+    Returns the lazy model registry (each model is built on first use) and the errors dict.
     """
     print("\n--- Initializing Models ---")
 
     try:
         # Pass configuration directly to the decoupled model loader
-        initialized_models, init_errors = model_loader.initialize_models(
-            api_keys=settings.API_KEYS,
+        model_registry, init_errors = model_loader.initialize_models(
+            get_api_key=settings.get_api_key,
             api_key_arg_names=settings.API_KEY_ARG_NAMES
         )
+        if settings.LLM_CACHE_DATABASE_PATH:
+            model_loader.enable_llm_cache(settings.LLM_CACHE_DATABASE_PATH)
         print("--- Model Initialization Complete ---")
-        return initialized_models, init_errors
+        return model_registry, init_errors
     except Exception as e:
         error_msg = f"An unexpected error occurred while trying to load models: {str(e)}"
         print(error_msg)
         traceback.print_exc()
-        return {}, {"model_loader.py_execution": error_msg}
+        init_errors = {"model_loader.py_execution": error_msg}
+        return model_loader.ModelRegistry({}, init_errors), init_errors
 
 
 # --- Main Application Loop for Research Q&A ---
-def run_research_qa_loop():
+def run_research_qa_loop() -> None:
     """Initializes models and runs the research Q&A loop."""
 
-    initialized_models, init_errors = initialize_all_ai_models()
+    try:
+        from langchain.agents import AgentExecutor, create_tool_calling_agent
+        from langchain_core.prompts import ChatPromptTemplate
+    except ImportError as e:
+        print(f"FATAL ERROR: Could not import LangChain agent components: {e}")
+        print("Please ensure LangChain is installed correctly (e.g., pip install langchain-core langchain).")
+        sys.exit(1)
+
+    model_registry, init_errors = initialize_all_ai_models()
 
-    if not initialized_models:
+    if not model_registry:
         print("\n--- FATAL ERROR ---")
-        print("No AI models were successfully initialized.")
+        print("No AI models are configured (no API keys found).")
         if init_errors:
-            print("The following errors occurred during initialization:")
+            print("The following configuration problems were found:")
             for model_name_key, error_msg in init_errors.items():
                 print(f"- {model_name_key}: {error_msg}")
         else:
-            print("No specific errors were reported, but initialization failed.")
+            print("No specific errors were reported, but no models are available.")
         sys.exit(1)
 
     # --- Initialize Tools ---
@@ -132,16 +253,26 @@ def run_research_qa_loop():
         ("placeholder", "{agent_scratchpad}"),
     ])
 
-    available_model_keys = sorted(list(initialized_models.keys()))
+    # Executors hold no per-session state (history is passed on each call),
+    # so one per model is built on first selection and reused afterwards.
+    @functools.lru_cache(maxsize=None)
+    def get_agent_executor(model_key: str) -> "AgentExecutor":
+        agent = create_tool_calling_agent(model_registry[model_key], tools, agent_prompt)
+        # Streamed model calls skip the LLM cache, so stream only when it is off.
+        return AgentExecutor(agent=agent, tools=tools, verbose=True,
+                             stream_runnable=not settings.LLM_CACHE_DATABASE_PATH)
+
+    available_model_keys = sorted(model_registry)
+    model_menu = _render_model_menu(_group_models_by_provider(available_model_keys))
 
-    print(f"\n--- Successfully Initialized Models ({len(available_model_keys)} available) ---")
-    _display_model_menu(available_model_keys)
+    print(f"\n--- Available Models ({len(available_model_keys)} configured) ---")
+    sys.stdout.write(model_menu)
 
     if init_errors:
-        print("\n--- Initialization Warnings ---")
-        print("Some models may have failed to initialize. They will not be available if not listed above.")
+        print("\n--- Configuration Warnings ---")
+        print("Some models are not configured (e.g. missing API key) and are not listed above.")
         for model_name_key, error_msg in init_errors.items():
-            if model_name_key not in initialized_models:
+            if model_name_key not in model_registry:
                 print(f"- {model_name_key}: {error_msg}")
 
     # Outer loop for model selection and Q&A sessions
@@ -151,7 +282,7 @@ def run_research_qa_loop():
         while True:  # Model selection inner loop
             print("\n----------------------------------------")
             print("Select a model for your research questions:")
-            _display_model_menu(available_model_keys)
+            sys.stdout.write(model_menu)
             print("0. Exit Program")
 
             choice = input("Enter model choice number: ").strip()
@@ -171,14 +302,19 @@ def run_research_qa_loop():
 
         # Agent Session Loop with the selected model
         if selected_key:
-            # --- Create Agent and Executor for the selected model ---
-            llm = initialized_models[selected_key]
-            agent = create_tool_calling_agent(llm, tools, agent_prompt)
-            agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
-            print(f"Agent created for model: {selected_key}. Ready for questions.")
+            # --- Get (or create) the Agent Executor for the selected model ---
+            # The model itself is constructed here on first selection.
+            try:
+                agent_executor = get_agent_executor(selected_key)
+            except Exception as e:
+                print(f"Could not set up an agent for {selected_key}: {e}")
+                print("Returning to model selection.")
+                continue
+            print(f"Agent ready for model: {selected_key}. Ready for questions.")
 
             # --- Initialize Chat History for the new session ---
-            chat_history: list[BaseMessage] = []
+            # Each turn adds a human and an AI message; the oldest turns are evicted.
+            chat_history: deque[BaseMessage] = deque(maxlen=2 * settings.MAX_HISTORY_TURNS)
 
             # Q&A session loop for the current model
             while True:  # Q&A session loop for the current model
@@ -192,53 +328,37 @@ def run_research_qa_loop():
                     continue
 
                 print(f"\nProcessing your question with agent ({selected_key})...")
+                answer_printer = _AnswerStreamPrinter(f"\n--- Answer from {selected_key} ---")
+                agent_failed = False
                 try:
                     response = agent_executor.invoke({
                         "input": question,
-                        "chat_history": chat_history
-                    })
+                        "chat_history": list(chat_history)
+                    }, config={"callbacks": [answer_printer]})
                     summary_answer = response.get("output", "Agent did not return an answer.")
                     # Add interaction to history for conversational context
-                    chat_history.extend([HumanMessage(content=question), response["output"]])
+                    chat_history.extend([HumanMessage(content=question), AIMessage(content=response["output"])])
                 except Exception as e:
+                    agent_failed = True
                     summary_answer = f"An error occurred while running the agent: {e}"
 
-                print(f"\n--- Answer from {selected_key} ---")
-                print(summary_answer)
+                if answer_printer.started:
+                    print()  # End the streamed answer line
+                    if agent_failed:
+                        print(summary_answer)
+                else:
+                    # Nothing was streamed (e.g. a non-streaming call or an early error)
+                    print(answer_printer.header)
+                    print(summary_answer)
                 print("----------------------------------------")
 
                 # Post-answer menu
-                action_prompt = (
-                    "Options:\n"
-                    "1. Ask a follow-up (continue this conversation)\n"
-                    "2. Start a new topic (clears conversation history)\n"
-                    "3. Change model\n"
-                    "4. Exit program\n"
-                    "Enter choice (1/2/3/4): "
-                )
-                user_action_valid = False
-                while not user_action_valid:  # Loop for valid action choice
-                    user_action = input(action_prompt).strip()
-                    if user_action == '1':  # Ask a follow-up
-                        user_action_valid = True
-                        # No break needed here, outer Q&A loop will continue
-                    elif user_action == '2':  # Start a new topic
-                        print("\nClearing conversation history for a new topic.")
-                        chat_history.clear()
-                        user_action_valid = True
-                        # No break needed, loop will continue with empty history
-                    elif user_action == '3':  # Change model
-                        print(f"Ending session with {selected_key}.")
-                        user_action_valid = True
-                        # This break will exit the Q&A session loop,
-                        # and the outer model selection loop will restart.
-                    elif user_action == '4':  # Exit program
-                        print("Exiting program.")
-                        sys.exit(0)
-                    else:
-                        print("Invalid choice. Please enter 1, 2, 3, or 4.")
-
-                if user_action == '3':  # If "Change model" was chosen
+                handler = _POST_ANSWER_ACTIONS.get(input(_ACTION_PROMPT).strip())
+                while handler is None:  # Loop for valid action choice
+                    print("Invalid choice. Please enter 1, 2, 3, or 4.")
+                    handler = _POST_ANSWER_ACTIONS.get(input(_ACTION_PROMPT).strip())
+
+                if not handler(selected_key, chat_history):
                     break  # Break from the Q&A session loop to go back to model selection
         else:
             # This case should ideally not be reached if model selection logic is sound
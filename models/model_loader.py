@@ -1,125 +1,228 @@
-# Import necessary standard LangChain classes
-from langchain_openai import ChatOpenAI
-from langchain_groq import ChatGroq
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_anthropic import ChatAnthropic
-from langchain_xai.chat_models import ChatXAI
+import functools
+from collections.abc import Iterator, Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Optional
+
+
+# --- Provider Class Loaders ---
+# Each provider SDK is imported on first use and cached, so providers that are
+# never instantiated (no API key, or not selected) are never imported.
+@functools.cache
+def _chat_openai() -> type:
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI
+
+
+@functools.cache
+def _chat_groq() -> type:
+    from langchain_groq import ChatGroq
+    return ChatGroq
+
+
+@functools.cache
+def _chat_google() -> type:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI
+
+
+@functools.cache
+def _chat_anthropic() -> type:
+    from langchain_anthropic import ChatAnthropic
+    return ChatAnthropic
+
+
+@functools.cache
+def _chat_xai() -> type:
+    from langchain_xai.chat_models import ChatXAI
+    return ChatXAI
+
+
+# --- Model Specifications ---
+@dataclass(slots=True, frozen=True)
+class ModelSpec:
+    """One selectable model: its menu key, provider model id and constructor details."""
+    key: str
+    model_name: str
+    class_factory: Callable[[], type]
+    args: Mapping[str, Any]
+    model_id_key: str
+
+
+# Constructor args shared by every spec below (read-only, so it is safe to share).
+_DEFAULT_ARGS = MappingProxyType({"temperature": 0.7})
 
 # --- MODEL_DEFINITIONS (with model_id_key) ---
-MODEL_DEFINITIONS = {
-    "openai": [
-        {"key": "openai/gpt-4.1-mini", "model_name": "gpt-4.1-mini", "class": ChatOpenAI, "args": {"temperature": 0.7},
-         "model_id_key": "model_name"},
-        {"key": "openai/gpt-4.5-preview-2025-02-27", "model_name": "gpt-4.5-preview-2025-02-27", "class": ChatOpenAI,
-         "args": {"temperature": 0.7}, "model_id_key": "model_name"},
-        {"key": "openai/gpt-4o-mini", "model_name": "gpt-4o-mini", "class": ChatOpenAI,
-         "args": {"temperature": 0.7}, "model_id_key": "model_name"},
-        {"key": "openai/gpt-4.1", "model_name": "gpt-4.1", "class": ChatOpenAI,
-         "args": {"temperature": 0.7}, "model_id_key": "model_name"},
-    ],
-    "groq": [
-        {"key": "groq/meta-llama/llama-guard-4-12b", "model_name": "meta-llama/llama-guard-4-12b", "class": ChatGroq,
-         "args": {"temperature": 0.7}, "model_id_key": "model_name"},
-        {"key": "groq/meta-llama/llama-4-scout-17b-16e-instruct",
-         "model_name": "meta-llama/llama-4-scout-17b-16e-instruct", "class": ChatGroq, "args": {"temperature": 0.7},
-         "model_id_key": "model_name"},
-        {"key": "groq/deepseek-r1-distill-llama-70b", "model_name": "deepseek-r1-distill-llama-70b", "class": ChatGroq,
-         "args": {"temperature": 0.7}, "model_id_key": "model_name"},
-        {"key": "groq/llama-4-maverick-17b", "model_name": "meta-llama/llama-4-maverick-17b-128e-instruct",
-         "class": ChatGroq, "args": {"temperature": 0.7}, "model_id_key": "model_name"},
-        {"key": "groq/llama-3.3-70b-versatile", "model_name": "llama-3.3-70b-versatile", "class": ChatGroq,
-         "args": {"temperature": 0.7}, "model_id_key": "model_name"},
-        {"key": "groq/qwen-qwq-32b", "model_name": "qwen-qwq-32b", "class": ChatGroq, "args": {"temperature": 0.7},
-         "model_id_key": "model_name"},
-    ],
-    "google": [
-        {"key": "google/gemini-2.5-flash-preview-04-17", "model_name": "gemini-2.5-flash-preview-04-17",
-         "class": ChatGoogleGenerativeAI, "args": {"temperature": 0.7}, "model_id_key": "model"},
-        {"key": "google/gemini-2.5-pro", "model_name": "gemini-2.5-pro",
-         "class": ChatGoogleGenerativeAI, "args": {"temperature": 0.7}, "model_id_key": "model"},
-        {"key": "google/gemma-3-12b-it", "model_name": "gemma-3-12b-it", "class": ChatGoogleGenerativeAI,
-         "args": {"temperature": 0.7}, "model_id_key": "model"},
-        {"key": "google/gemini-2.5-flash", "model_name": "gemini-2.5-flash", "class": ChatGoogleGenerativeAI,
-         "args": {"temperature": 0.7}, "model_id_key": "model"},
-    ],
-    "anthropic": [
-        {"key": "anthropic/claude-3-5-sonnet", "model_name": "claude-3-5-sonnet-20241022", "class": ChatAnthropic,
-         "args": {"temperature": 0.7}, "model_id_key": "model_name"},
-        {"key": "anthropic/claude-3.7-sonnet", "model_name": "claude-3-7-sonnet-20250219", "class": ChatAnthropic,
-         "args": {"temperature": 0.7}, "model_id_key": "model_name"},
-        {"key": "anthropic/Claude Sonnet 4", "model_name": "claude-sonnet-4-20250514", "class": ChatAnthropic,
-         "args": {"temperature": 0.7}, "model_id_key": "model_name"},
-        {"key": "anthropic/Claude Opus 4", "model_name": "claude-opus-4-20250514", "class": ChatAnthropic,
-         "args": {"temperature": 0.7}, "model_id_key": "model_name"}
-    ],
-    "xai": [
-        {"key": "xAI/Grok 3", "model_name": "grok-3", "class": ChatXAI,
-         "args": {"temperature": 0.7}, "model_id_key": "model"},
-        {"key": "xAI/grok 3 mini", "model_name": "grok-3-mini", "class": ChatXAI,
-         "args": {"temperature": 0.7}, "model_id_key": "model"},
-        {"key": "xAI/Grok 3 mini fast", "model_name": "grok-3-mini-fast", "class": ChatXAI,
-         "args": {"temperature": 0.7}, "model_id_key": "model"},
-        {"key": "xAI/Grok 4", "model_name": "grok-4-0407", "class": ChatXAI,
-         "args": {"temperature": 0.7}, "model_id_key": "model"},
-    ],
+MODEL_DEFINITIONS: dict[str, tuple[ModelSpec, ...]] = {
+    "openai": (
+        ModelSpec(key="openai/gpt-4.1-mini", model_name="gpt-4.1-mini",
+                  class_factory=_chat_openai, args=_DEFAULT_ARGS, model_id_key="model_name"),
+        ModelSpec(key="openai/gpt-4.5-preview-2025-02-27", model_name="gpt-4.5-preview-2025-02-27",
+                  class_factory=_chat_openai, args=_DEFAULT_ARGS, model_id_key="model_name"),
+        ModelSpec(key="openai/gpt-4o-mini", model_name="gpt-4o-mini",
+                  class_factory=_chat_openai, args=_DEFAULT_ARGS, model_id_key="model_name"),
+        ModelSpec(key="openai/gpt-4.1", model_name="gpt-4.1",
+                  class_factory=_chat_openai, args=_DEFAULT_ARGS, model_id_key="model_name"),
+    ),
+    "groq": (
+        ModelSpec(key="groq/meta-llama/llama-guard-4-12b", model_name="meta-llama/llama-guard-4-12b",
+                  class_factory=_chat_groq, args=_DEFAULT_ARGS, model_id_key="model_name"),
+        ModelSpec(key="groq/meta-llama/llama-4-scout-17b-16e-instruct",
+                  model_name="meta-llama/llama-4-scout-17b-16e-instruct",
+                  class_factory=_chat_groq, args=_DEFAULT_ARGS, model_id_key="model_name"),
+        ModelSpec(key="groq/deepseek-r1-distill-llama-70b", model_name="deepseek-r1-distill-llama-70b",
+                  class_factory=_chat_groq, args=_DEFAULT_ARGS, model_id_key="model_name"),
+        ModelSpec(key="groq/llama-4-maverick-17b", model_name="meta-llama/llama-4-maverick-17b-128e-instruct",
+                  class_factory=_chat_groq, args=_DEFAULT_ARGS, model_id_key="model_name"),
+        ModelSpec(key="groq/llama-3.3-70b-versatile", model_name="llama-3.3-70b-versatile",
+                  class_factory=_chat_groq, args=_DEFAULT_ARGS, model_id_key="model_name"),
+        ModelSpec(key="groq/qwen-qwq-32b", model_name="qwen-qwq-32b",
+                  class_factory=_chat_groq, args=_DEFAULT_ARGS, model_id_key="model_name"),
+    ),
+    "google": (
+        ModelSpec(key="google/gemini-2.5-flash-preview-04-17", model_name="gemini-2.5-flash-preview-04-17",
+                  class_factory=_chat_google, args=_DEFAULT_ARGS, model_id_key="model"),
+        ModelSpec(key="google/gemini-2.5-pro", model_name="gemini-2.5-pro",
+                  class_factory=_chat_google, args=_DEFAULT_ARGS, model_id_key="model"),
+        ModelSpec(key="google/gemma-3-12b-it", model_name="gemma-3-12b-it",
+                  class_factory=_chat_google, args=_DEFAULT_ARGS, model_id_key="model"),
+        ModelSpec(key="google/gemini-2.5-flash", model_name="gemini-2.5-flash",
+                  class_factory=_chat_google, args=_DEFAULT_ARGS, model_id_key="model"),
+    ),
+    "anthropic": (
+        ModelSpec(key="anthropic/claude-3-5-sonnet", model_name="claude-3-5-sonnet-20241022",
+                  class_factory=_chat_anthropic, args=_DEFAULT_ARGS, model_id_key="model_name"),
+        ModelSpec(key="anthropic/claude-3.7-sonnet", model_name="claude-3-7-sonnet-20250219",
+                  class_factory=_chat_anthropic, args=_DEFAULT_ARGS, model_id_key="model_name"),
+        ModelSpec(key="anthropic/Claude Sonnet 4", model_name="claude-sonnet-4-20250514",
+                  class_factory=_chat_anthropic, args=_DEFAULT_ARGS, model_id_key="model_name"),
+        ModelSpec(key="anthropic/Claude Opus 4", model_name="claude-opus-4-20250514",
+                  class_factory=_chat_anthropic, args=_DEFAULT_ARGS, model_id_key="model_name"),
+    ),
+    "xai": (
+        ModelSpec(key="xAI/Grok 3", model_name="grok-3",
+                  class_factory=_chat_xai, args=_DEFAULT_ARGS, model_id_key="model"),
+        ModelSpec(key="xAI/grok 3 mini", model_name="grok-3-mini",
+                  class_factory=_chat_xai, args=_DEFAULT_ARGS, model_id_key="model"),
+        ModelSpec(key="xAI/Grok 3 mini fast", model_name="grok-3-mini-fast",
+                  class_factory=_chat_xai, args=_DEFAULT_ARGS, model_id_key="model"),
+        ModelSpec(key="xAI/Grok 4", model_name="grok-4-0407",
+                  class_factory=_chat_xai, args=_DEFAULT_ARGS, model_id_key="model"),
+    ),
+}
+
+
+# Flat key -> (provider, ModelSpec) index, so initialize_models makes one pass
+# without nested loops.
+_MODEL_INDEX = {
+    spec.key: (provider, spec)
+    for provider, specs in MODEL_DEFINITIONS.items()
+    for spec in specs
 }
 
 
+# --- ModelRegistry Class ---
+class ModelRegistry(Mapping[str, Any]):
+    """
+    Read-only mapping from model key to chat model instance.
+    Configuration is resolved up front, but each model is only constructed on
+    first access and then reused, so unused models cost nothing at startup.
+    """
+
+    def __init__(
+        self,
+        model_factories: dict[str, tuple[Callable[[], type], dict[str, Any]]],
+        errors: dict[str, str]
+    ) -> None:
+        """
+        Args:
+            model_factories (dict): Maps model keys to (class_factory, constructor_kwargs),
+                                    where class_factory() returns the chat model class.
+            errors (dict): Shared errors dict; construction failures are added to it.
+        """
+        self._model_factories = model_factories
+        self._models: dict[str, Any] = {}
+        self._errors = errors
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._model_factories)
+
+    def __len__(self) -> int:
+        return len(self._model_factories)
+
+    def __getitem__(self, model_key: str) -> Any:
+        model = self._models.get(model_key)
+        if model is not None:
+            return model
+
+        class_factory, constructor_kwargs = self._model_factories[model_key]
+        try:
+            model = class_factory()(**constructor_kwargs)
+        except Exception as e:
+            error_msg = f"Model construction failed: {e}"
+            self._errors[model_key] = error_msg
+            raise RuntimeError(error_msg) from e
+
+        self._models[model_key] = model
+        return model
+
+
 # --- initialize_models Function (MODIFIED) ---
-def initialize_models(api_keys: dict, api_key_arg_names: dict):
+def initialize_models(
+    get_api_key: Callable[[str], Optional[str]],
+    api_key_arg_names: dict
+) -> tuple[ModelRegistry, dict[str, str]]:
     """
-    Initializes all models defined in MODEL_DEFINITIONS based on available API keys.
+    Resolves all models defined in MODEL_DEFINITIONS based on available API keys.
     This is a pure function that receives configuration and returns data without
-    side effects like printing.
+    side effects like printing. Models are not constructed here; the returned
+    registry builds each one the first time it is looked up.
 
     Args:
-        api_keys (dict): A dictionary mapping provider names to their API keys.
+        get_api_key (callable): Returns the API key for a provider name, or None.
         api_key_arg_names (dict): A dictionary mapping provider names to the
                                   constructor argument name for the API key.
 
     Returns:
-        tuple: (initialized_models dict, initialization_errors dict)
+        tuple: (ModelRegistry of available models, initialization_errors dict).
+               Construction failures are added to the errors dict on access.
     """
-    initialized_models = {}
+    model_factories = {}
     initialization_errors = {}
 
-    for provider, model_list in MODEL_DEFINITIONS.items():
-        api_key = api_keys.get(provider)
+    for provider, spec in _MODEL_INDEX.values():
         api_key_arg_name = api_key_arg_names.get(provider)
-
         if not api_key_arg_name:
-            # Log errors for all models under this unconfigured provider
-            for model_def in model_list:
-                initialization_errors[model_def["key"]] = f"Provider '{provider}' not configured in API_KEY_ARG_NAMES."
+            initialization_errors[spec.key] = f"Provider '{provider}' not configured in API_KEY_ARG_NAMES."
             continue
 
+        api_key = get_api_key(provider)
         if not api_key:
-            for model_def in model_list:
-                initialization_errors[model_def["key"]] = f"{provider.capitalize()} API Key not found."
+            initialization_errors[spec.key] = f"{provider.capitalize()} API Key not found."
             continue
 
-        for model_def in model_list:
-            model_key = model_def["key"]
-            model_identifier_value = model_def["model_name"]
-            model_class = model_def["class"]
-            constructor_id_param_name = model_def.get("model_id_key")
+        final_constructor_args = dict(spec.args, **{
+            spec.model_id_key: spec.model_name,
+            api_key_arg_name: api_key,
+        })
+        model_factories[spec.key] = (spec.class_factory, final_constructor_args)
 
-            if not constructor_id_param_name:
-                error_msg = f"Configuration error: 'model_id_key' missing for {model_key} in MODEL_DEFINITIONS."
-                initialization_errors[model_key] = error_msg
-                continue
+    return ModelRegistry(model_factories, initialization_errors), initialization_errors
 
-            model_args_from_def = model_def["args"].copy()
-            model_args_from_def[api_key_arg_name] = api_key
 
-            try:
-                constructor_kwargs = {constructor_id_param_name: model_identifier_value}
-                final_constructor_args = {**constructor_kwargs, **model_args_from_def}
-
-                initialized_models[model_key] = model_class(**final_constructor_args)
+# --- enable_llm_cache Function ---
+def enable_llm_cache(database_path: str) -> None:
+    """
+    Enables LangChain's process-wide exact-match LLM cache backed by SQLite.
+    Identical (model, parameters, messages) invoke/generate calls are answered
+    from the cache instead of the provider API; streamed calls do not consult it.
+    Kept separate from initialize_models so that function stays free of global
+    side effects.
 
-            except Exception as e:
-                error_msg = f"Failed to initialize {model_key}: {e}"
-                initialization_errors[model_key] = error_msg
+    Args:
+        database_path (str): Path of the SQLite file used to store cached responses.
+    """
+    from langchain_community.cache import SQLiteCache
+    from langchain_core.globals import set_llm_cache
 
-    return initialized_models, initialization_errors
\ No newline at end of file
+    set_llm_cache(SQLiteCache(database_path=database_path))
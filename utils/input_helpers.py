@@ -1,14 +1,30 @@
 # utils/input_helpers.py
+import sys
+
+_END_MARKER = "done!!!"
+
 
 def get_multiline_input(prompt_message: str) -> str:
     """Helper function to get multi-line input from the user."""
     print(prompt_message)
     print("Enter line by line. Type 'done!!!' on a new line when you are finished:")
     lines = []
+    if not sys.stdin.isatty():
+        # Piped/pasted input: read straight from the buffered stream instead of
+        # paying input()'s per-line overhead. Stops at the marker, so anything
+        # after it is left for later prompts.
+        append = lines.append
+        for line in sys.stdin:
+            line = line.rstrip("\n")
+            if line.strip().lower() == _END_MARKER:
+                break
+            append(line)
+        return "\n".join(lines).strip()
+
     while True:
         try:
             line = input()
-            if line.strip().lower() == "done!!!":
+            if line.strip().lower() == _END_MARKER:
                 break
             lines.append(line)
         except EOFError: # Handle Ctrl+D or Ctrl+Z